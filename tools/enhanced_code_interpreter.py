@@ -7,16 +7,41 @@ version: 1.0.0
 licence: MIT
 """
 
+import ast
 import asyncio
+import importlib
+import io
+import re
+import reprlib
 import sys
+import threading
 import time
 import traceback
 from datetime import datetime
-from io import StringIO
-from typing import Literal
+from functools import lru_cache
+from types import CodeType
+from typing import Literal, NamedTuple
 
 from pydantic import BaseModel, Field
 
+# names user code may not reference in sandbox mode, called or aliased
+_BLOCKED_NAMES = frozenset(
+    {"open", "compile", "exec", "eval", "__import__", "__builtins__", "globals", "vars"}
+)
+
+# stdout writers kept for reuse across executions
+_IO_POOL_SIZE = 4
+
+# response blocks, filled with str.format
+_OUTPUT_BLOCK = "**Output:**\n```\n{}{}\n```"
+_ERROR_BLOCK = "**Error:**\n```\n{}\n```"
+
+# sources longer than this skip the compile cache
+_COMPILE_CACHE_MAX_SRC = 64 * 1024
+
+# captured stdout may grow to this multiple of max_output_length before the run is stopped
+_OUTPUT_HEADROOM = 2
+
 
 class Tools:
     class Valves(BaseModel):
@@ -44,6 +69,10 @@ class Tools:
             default="import os,import subprocess,import shutil,import socket,import http.client,__import__,importlib,open(,compile(",
             description="Comma-separated substrings blocked in sandbox mode",
         )
+        blocked_modules: str = Field(
+            default="os,subprocess,shutil,socket,http.client,importlib,ctypes,multiprocessing,builtins",
+            description="Comma-separated modules (and their submodules) whose import is blocked in sandbox mode",
+        )
 
     class UserValves(BaseModel):
         show_execution_time: bool = Field(
@@ -54,6 +83,29 @@ class Tools:
         self.valves = self.Valves()
         self._state: dict[str, dict] = {}
         self._exec_counts: dict[str, int] = {}
+        self._compiled_patterns: re.Pattern | None = None
+        self._patterns_src: str | None = None
+        self._blocked_modules: frozenset[str] = frozenset()
+        self._modules_src: str | None = None
+        self._ns_template: dict | None = None
+        self._ns_template_key: str | None = None
+        self._io_pool: list[_BoundedWriter] = []
+        # bounded repr: large containers are never fully rendered for a preview
+        self._repr = reprlib.Repr()
+        self._repr.maxstring = 60
+        self._repr.maxother = 60
+        self._repr.maxlist = 3
+        self._repr.maxtuple = 3
+        self._repr.maxset = 3
+        self._repr.maxfrozenset = 3
+        self._repr.maxdict = 3
+
+        # PyPy's JIT only pays off once a path is hot; warm it before real traffic
+        if "__pypy__" in sys.builtin_module_names:
+            try:
+                asyncio.get_running_loop().call_soon(self._warmup)
+            except RuntimeError:
+                pass
 
     # ── internal helpers ─────────────────────────────────────
 
@@ -68,28 +120,78 @@ class Tools:
     def _validate(self, code: str) -> list[str]:
         if not self.valves.sandbox_mode:
             return []
-        blocked = [p.strip() for p in self.valves.blocked_patterns.split(",") if p.strip()]
-        return [f"Blocked: `{p}`" for p in blocked if p in code]
+        # recompile only when the valve string changes
+        if self.valves.blocked_patterns != self._patterns_src:
+            blocked = [p.strip() for p in self.valves.blocked_patterns.split(",") if p.strip()]
+            # longest first so overlapping patterns report the most specific match
+            blocked.sort(key=len, reverse=True)
+            self._compiled_patterns = (
+                re.compile("|".join(map(re.escape, blocked))) if blocked else None
+            )
+            self._patterns_src = self.valves.blocked_patterns
+        if self._compiled_patterns is None:
+            return []
+        found = dict.fromkeys(m.group() for m in self._compiled_patterns.finditer(code))
+        return [f"Blocked: `{p}`" for p in found]
 
-    def _build_namespace(self, user_state: dict) -> dict:
-        ns = {"__builtins__": __builtins__}
+    def _validate_ast(self, scan: "_CodeScan") -> list[str]:
+        if not self.valves.sandbox_mode:
+            return []
+        if self.valves.blocked_modules != self._modules_src:
+            self._blocked_modules = frozenset(
+                m.strip() for m in self.valves.blocked_modules.split(",") if m.strip()
+            )
+            self._modules_src = self.valves.blocked_modules
+
+        def _is_blocked(mod: str) -> bool:
+            # "os.path" is blocked by "os"; walk each dotted prefix
+            parts = mod.split(".")
+            return any(".".join(parts[:i]) in self._blocked_modules for i in range(1, len(parts) + 1))
+
+        found: dict[str, None] = {}
+        for module, name in scan.imports:
+            if name is None:
+                if _is_blocked(module):
+                    found[f"import {module}"] = None
+            elif _is_blocked(module) or _is_blocked(f"{module}.{name}"):
+                found[f"from {module} import {name}"] = None
+        for name in scan.names:
+            found[name] = None
+        return [f"Blocked: `{p}`" for p in found]
 
-        for mod_name in self.valves.auto_imports.split(","):
-            mod_name = mod_name.strip()
-            if not mod_name:
-                continue
-            try:
-                ns[mod_name] = __import__(mod_name)
-            except ImportError:
-                pass
+    def _build_namespace(self, user_state: dict) -> dict:
+        # modules and helpers only change with the valve, so build them once
+        if self.valves.auto_imports != self._ns_template_key:
+            tmpl = {
+                "__builtins__": __builtins__,
+                "quick_stats": _quick_stats,
+                "as_table": _as_table,
+            }
+            for mod_name in self.valves.auto_imports.split(","):
+                mod_name = mod_name.strip()
+                if not mod_name:
+                    continue
+                try:
+                    tmpl[mod_name] = importlib.import_module(mod_name)
+                except ImportError:
+                    pass
+            self._ns_template = tmpl
+            self._ns_template_key = self.valves.auto_imports
 
         # inject persistent variables from prior executions
-        ns.update(user_state)
-
-        # inject utility helpers
-        ns["quick_stats"] = _quick_stats
-        ns["as_table"] = _as_table
-        return ns
+        return {**self._ns_template, **user_state}
+
+    def _warmup(self, rounds: int = 100):
+        # drive validation, namespace build and exec through the JIT without
+        # touching any user's state or execution counter
+        src = "x = 1 + 1"
+        buf = _BoundedWriter()
+        for _ in range(rounds):
+            scan, code_obj = _compile_user_code(src)
+            self._validate(src)
+            self._validate_ast(scan)
+            buf.reset(self.valves.max_output_length)
+            _exec_code(code_obj, self._build_namespace({}), buf)
 
     # ── tool methods ─────────────────────────────────────────
 
@@ -108,10 +210,13 @@ class Tools:
         hashlib, base64) so you can use them without importing.
 
         Two utility helpers are also available:
-          quick_stats(numbers)  – returns dict with count/sum/mean/min/max/median
-          as_table(rows, title) – formats a list of dicts as a markdown table
+          quick_stats(numbers)        – returns dict with count/sum/mean/min/max/median
+          as_table(rows, title, echo) – formats a list of dicts as a markdown table
+                                        and prints it (pass echo=False to skip printing)
 
         Variables saved via save_vars persist across executions in this session.
+        Only output printed by the code itself is captured; print() calls from
+        threads it starts go to the server's stdout, not into the result.
 
         :param code: The Python source code to execute.
         :param save_vars: Comma-separated variable names to persist for later executions. Leave empty to save nothing.
@@ -126,7 +231,21 @@ class Tools:
                 {"type": "status", "data": {"description": "Validating...", "done": False}}
             )
 
-        issues = self._validate(code)
+        compile_error = None
+        try:
+            if len(code) > _COMPILE_CACHE_MAX_SRC:
+                # uncached large sources are parsed off the event loop
+                scan, code_obj = await asyncio.to_thread(_compile_user_code, code)
+            else:
+                scan, code_obj = _compile_user_code(code)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            # e.g. null bytes, or expressions nested too deeply for the parser
+            code_obj = None
+            compile_error = traceback.format_exc(limit=0)
+            issues = self._validate(code)
+        else:
+            # both checks can flag the same import; report it once
+            issues = list(dict.fromkeys(self._validate(code) + self._validate_ast(scan)))
         if issues:
             if __event_emitter__:
                 await __event_emitter__(
@@ -141,29 +260,35 @@ class Tools:
             )
 
         ns = self._build_namespace(state)
-        buf = StringIO()
+        limit = self.valves.max_output_length * _OUTPUT_HEADROOM
+        buf = self._io_pool.pop() if self._io_pool else _BoundedWriter()
+        buf.reset(limit)
         start = time.perf_counter()
 
-        def _run():
-            old = sys.stdout
-            sys.stdout = buf
-            try:
-                exec(code, ns)
-            finally:
-                sys.stdout = old
+        error = compile_error
 
-        error = None
-        try:
-            await asyncio.wait_for(
-                asyncio.to_thread(_run), timeout=self.valves.max_execution_time
-            )
-        except asyncio.TimeoutError:
-            error = f"Timed out after {self.valves.max_execution_time}s"
-        except Exception:
-            error = traceback.format_exc()
+        timed_out = False
+        if code_obj is not None:
+            try:
+                await asyncio.wait_for(
+                    asyncio.to_thread(_exec_code, code_obj, ns, buf), timeout=self.valves.max_execution_time
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+                error = f"Timed out after {self.valves.max_execution_time}s"
+            except _OutputLimitExceeded:
+                # runaway output is a normal stop; the notice is added below
+                pass
+            except Exception as e:
+                error = _format_user_traceback(e)
 
         elapsed = time.perf_counter() - start
-        stdout = buf.getvalue()
+        total_chars = buf.n
+        stdout = buf.getvalue()[: self.valves.max_output_length]
+        # a timed-out thread may still be writing, so never recycle its buffer
+        if not timed_out and len(self._io_pool) < _IO_POOL_SIZE:
+            buf.reset(limit)
+            self._io_pool.append(buf)
 
         # -- persist requested vars --
         saved = []
@@ -181,13 +306,16 @@ class Tools:
         parts: list[str] = []
 
         if stdout:
-            text = stdout[: self.valves.max_output_length]
-            if len(stdout) > self.valves.max_output_length:
-                text += f"\n... truncated ({len(stdout):,} total chars)"
-            parts.append(f"**Output:**\n```\n{text}\n```")
+            notice = ""
+            if total_chars > limit:
+                notice = f"\n... stopped: output exceeded {limit:,} chars"
+            elif total_chars > self.valves.max_output_length:
+                notice = f"\n... truncated ({total_chars:,} total chars)"
+            # one formatting pass, so large output is copied once rather than per concat
+            parts.append(_OUTPUT_BLOCK.format(stdout, notice))
 
         if error:
-            parts.append(f"**Error:**\n```\n{error}\n```")
+            parts.append(_ERROR_BLOCK.format(error))
 
         if saved:
             parts.append("**Saved:** " + ", ".join(f"`{v}`" for v in saved))
@@ -237,7 +365,7 @@ class Tools:
         lines.append("| Variable | Type | Size | Preview |")
         lines.append("|----------|------|------|---------|")
         for k, v in state.items():
-            preview = repr(v)
+            preview = self._repr.repr(v)
             if len(preview) > 60:
                 preview = preview[:57] + "..."
             lines.append(
@@ -271,43 +399,186 @@ class Tools:
         return f"Cleared {n} variable(s) and reset execution counter."
 
 
+# ── bounded stdout capture ────────────────────────────────────
+
+
+class _OutputLimitExceeded(BaseException):
+    """Raised inside user code once captured stdout passes its limit.
+
+    A BaseException so an ordinary ``except Exception`` in user code cannot swallow it.
+    """
+
+
+class _BoundedWriter(io.TextIOBase):
+    """Text sink that keeps at most `limit` chars and aborts the run beyond that."""
+
+    def __init__(self, limit: int = 0):
+        self.reset(limit)
+
+    def reset(self, limit: int) -> None:
+        self.chunks: list[str] = []
+        self.n = 0
+        self.limit = limit
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not isinstance(s, str):
+            raise TypeError(f"write() argument must be str, not {type(s).__name__}")
+        room = self.limit - self.n
+        self.n += len(s)
+        if self.n > self.limit:
+            if room > 0:
+                self.chunks.append(s[:room])
+            raise _OutputLimitExceeded()
+        self.chunks.append(s)
+        return len(s)
+
+    def getvalue(self) -> str:
+        return "".join(self.chunks)
+
+
+class _ThreadLocalStdout:
+    """sys.stdout proxy that routes writes to the calling thread's capture buffer, if any."""
+
+    _is_thread_local_stdout = True
+
+    def __init__(self, real):
+        self._real = real
+        self._tls = threading.local()
+
+    def _target(self):
+        buf = getattr(self._tls, "buf", None)
+        return self._real if buf is None else buf
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def _install_stdout_proxy() -> _ThreadLocalStdout:
+    # reuse a proxy left by an earlier load of this tool so captures keep working after reloads
+    if getattr(sys.stdout, "_is_thread_local_stdout", False):
+        return sys.stdout
+    proxy = _ThreadLocalStdout(sys.stdout)
+    sys.stdout = proxy
+    return proxy
+
+
+_install_stdout_proxy()
+
+
+class _CodeScan(NamedTuple):
+    """What the sandbox needs from a parsed tree, small enough to cache instead of the AST."""
+
+    imports: tuple[tuple[str, str | None], ...]  # (module, None) or (module, from-imported name)
+    names: tuple[str, ...]  # blocked names referenced, in order of appearance
+
+
+def _scan_tree(tree: ast.Module) -> _CodeScan:
+    imports: dict[tuple[str, str | None], None] = {}
+    names: dict[str, None] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports[(alias.name, None)] = None
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            for alias in node.names:
+                imports[(node.module, alias.name)] = None
+        elif isinstance(node, ast.Name) and node.id in _BLOCKED_NAMES:
+            # catches aliasing (`f = open`) as well as direct calls
+            names[node.id] = None
+    return _CodeScan(tuple(imports), tuple(names))
+
+
+@lru_cache(maxsize=128)
+def _parse_and_compile(src: str) -> tuple[_CodeScan, CodeType]:
+    # the tree is dropped after scanning; a cached AST costs far more than its code object
+    tree = ast.parse(src, filename="<user>", mode="exec")
+    return _scan_tree(tree), compile(tree, "<user>", "exec")
+
+
+def _compile_user_code(src: str) -> tuple[_CodeScan, CodeType]:
+    """Parse and compile user code, reusing results for recently seen sources."""
+    if len(src) > _COMPILE_CACHE_MAX_SRC:
+        return _parse_and_compile.__wrapped__(src)
+    return _parse_and_compile(src)
+
+
+def _exec_code(code_obj: CodeType, ns: dict, out: _BoundedWriter) -> None:
+    """Run compiled user code with this thread's stdout captured into `out`."""
+    # the host may have replaced sys.stdout since import; wrap whatever is current
+    proxy = _install_stdout_proxy()
+    proxy._tls.buf = out
+    try:
+        exec(code_obj, ns)
+    finally:
+        proxy._tls.buf = None
+
+
+def _format_user_traceback(exc: BaseException) -> str:
+    """Format an exception showing only frames from the user's code."""
+    tbe = traceback.TracebackException.from_exception(exc, lookup_lines=False)
+    seen = set()
+    node = tbe
+    # drop asyncio/to_thread/exec plumbing from the error and any chained causes
+    while node is not None and id(node) not in seen:
+        seen.add(id(node))
+        node.stack = traceback.StackSummary.from_list(
+            [f for f in node.stack if f.filename == "<user>"]
+        )
+        node = node.__cause__ or node.__context__
+    return "".join(tbe.format())
+
+
 # ── standalone helpers injected into execution namespace ──────
 
 
 def _quick_stats(numbers: list) -> dict:
     """Return count, sum, mean, min, max, median for a list of numbers."""
-    if not numbers:
-        return {}
+    # one sort gives min/max/median; sum is taken once and reused for the mean
     s = sorted(numbers)
     n = len(s)
+    if n == 0:
+        return {}
+    total = sum(s)
     return {
         "count": n,
-        "sum": sum(s),
-        "mean": sum(s) / n,
+        "sum": total,
+        "mean": total / n,
         "min": s[0],
         "max": s[-1],
         "median": s[n // 2] if n % 2 else (s[n // 2 - 1] + s[n // 2]) / 2,
     }
 
 
-def _as_table(data: list[dict], title: str = "") -> str:
-    """Format a list of dicts as a markdown table string. Print it to see it."""
+def _as_table(data: list[dict], title: str = "", echo: bool = True) -> str:
+    """Format a list of dicts as a markdown table string. Printed unless echo=False."""
     if not data:
         return "(empty)"
-    headers = list(data[0].keys())
+    headers = [str(h) for h in data[0]]
+    keys = list(data[0])
+    # stringify every cell once; widths and emission share the same matrix
+    str_rows = [[str(row.get(k, "")) for k in keys] for row in data]
     widths = [
-        max(len(str(h)), *(len(str(row.get(h, ""))) for row in data))
-        for h in headers
+        max(len(headers[i]), max((len(r[i]) for r in str_rows), default=0))
+        for i in range(len(headers))
     ]
     lines = []
     if title:
         lines.append(f"**{title}**\n")
     lines.append("| " + " | ".join(h.ljust(w) for h, w in zip(headers, widths)) + " |")
     lines.append("| " + " | ".join("-" * w for w in widths) + " |")
-    for row in data:
-        lines.append(
-            "| " + " | ".join(str(row.get(h, "")).ljust(w) for h, w in zip(headers, widths)) + " |"
-        )
+    lines.extend(
+        "| " + " | ".join(c.ljust(w) for c, w in zip(r, widths)) + " |" for r in str_rows
+    )
     result = "\n".join(lines)
-    print(result)
+    if echo:
+        print(result)
     return result
@@ -14,7 +14,26 @@ from datetime import datetime, timezone
 
 class Tools:
     def __init__(self):
-        pass
+        # (cache key, day-level fields) — recomputed when the date or DST state changes
+        self._day_cache: tuple = (None, None)
+
+    def _day_fields(self, now: datetime) -> dict:
+        key = (now.date(), time.localtime().tm_isdst)
+        if key != self._day_cache[0]:
+            tz_name = time.tzname[time.daylight] if time.daylight else time.tzname[0]
+            utc_offset = now.astimezone().strftime("%z")
+            iso_week = now.isocalendar()
+            leap = now.year % 4 == 0 and (now.year % 100 != 0 or now.year % 400 == 0)
+            self._day_cache = (
+                key,
+                {
+                    "date": now.strftime("%A, %B %d, %Y"),
+                    "tz": f"{tz_name} (UTC{utc_offset[:3]}:{utc_offset[3:]})",
+                    "iso_week": f"{iso_week[0]}-W{iso_week[1]:02d}-{iso_week[2]}",
+                    "day": f"{now.timetuple().tm_yday}/{'366' if leap else '365'}",
+                },
+            )
+        return self._day_cache[1]
 
     async def current_datetime(self) -> str:
         """
@@ -23,15 +42,13 @@ class Tools:
         """
         now = datetime.now()
         utc_now = datetime.now(timezone.utc)
-        tz_name = time.tzname[time.daylight] if time.daylight else time.tzname[0]
-        utc_offset = now.astimezone().strftime("%z")
-        iso_week = now.isocalendar()
+        day = self._day_fields(now)
 
         return (
-            f"- **Date:** {now.strftime('%A, %B %d, %Y')}\n"
-            f"- **Time:** {now.strftime('%I:%M:%S %p')} {tz_name} (UTC{utc_offset[:3]}:{utc_offset[3:]})\n"
+            f"- **Date:** {day['date']}\n"
+            f"- **Time:** {now.strftime('%I:%M:%S %p')} {day['tz']}\n"
             f"- **UTC:** {utc_now.strftime('%Y-%m-%d %H:%M:%S')}Z\n"
-            f"- **ISO Week:** {iso_week[0]}-W{iso_week[1]:02d}-{iso_week[2]}\n"
-            f"- **Day:** {now.timetuple().tm_yday}/{'366' if now.year % 4 == 0 and (now.year % 100 != 0 or now.year % 400 == 0) else '365'}\n"
+            f"- **ISO Week:** {day['iso_week']}\n"
+            f"- **Day:** {day['day']}\n"
             f"- **Unix:** {int(time.time())}"
         )
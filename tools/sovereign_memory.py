@@ -10,10 +10,30 @@ licence: MIT
 """
 
 import aiosqlite
+import asyncio
 import os
+import re
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+# prune over-limit users on their first write per instance, then once every N writes
+_PRUNE_EVERY = 16
+
+_UPSERT_SQL = """
+    INSERT INTO memories (user_id, topic, content, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, topic) DO UPDATE
+    SET content = excluded.content, updated_at = excluded.updated_at
+    RETURNING created_at = updated_at
+"""
+_COUNT_SQL = "SELECT COUNT(*) FROM memories WHERE user_id = ?"
+_PRUNE_SQL = """
+    DELETE FROM memories WHERE id IN (
+        SELECT id FROM memories WHERE user_id = ?
+        ORDER BY updated_at ASC
+        LIMIT ?
+    )
+"""
 
 class Tools:
     class Valves(BaseModel):
@@ -31,13 +51,25 @@ class Tools:
     def __init__(self):
         self.valves = self.Valves()
         self._initialized = False
+        self._fts = False
+        self._conn: aiosqlite.Connection | None = None
+        self._init_lock = asyncio.Lock()
+        # serializes write transactions on the shared connection
+        self._write_lock = asyncio.Lock()
+        self._write_count: dict[str, int] = {}
 
     async def _ensure_db(self):
         if self._initialized:
             return
-        os.makedirs(os.path.dirname(self.valves.db_path), exist_ok=True)
-        async with aiosqlite.connect(self.valves.db_path) as db:
+        async with self._init_lock:
+            if self._initialized:
+                return
+            os.makedirs(os.path.dirname(self.valves.db_path), exist_ok=True)
+            db = await aiosqlite.connect(self.valves.db_path)
             await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute("PRAGMA synchronous=NORMAL")
+            await db.execute("PRAGMA temp_store=MEMORY")
+            await db.execute("PRAGMA cache_size=-20000")
             await db.execute(
                 """
                 CREATE TABLE IF NOT EXISTS memories (
@@ -50,29 +82,84 @@ class Tools:
                 )
                 """
             )
-            await db.execute(
+            await self._ensure_unique_topics(db)
+            await db.commit()
+            self._fts = await self._ensure_fts(db)
+            self._conn = db
+            self._initialized = True
+
+    async def close(self):
+        """Close the shared database connection; it is reopened on next use."""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        self._initialized = False
+
+    async def _ensure_unique_topics(self, db):
+        # one row per (user_id, topic) lets remember() upsert in a single statement
+        existing = await db.execute_fetchall(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_mem_user_topic'"
+        )
+        if existing:
+            return
+        # keep the newest row of any duplicates left by older versions
+        await db.execute(
+            """
+            DELETE FROM memories WHERE id NOT IN (
+                SELECT MAX(id) FROM memories GROUP BY user_id, topic
+            )
+            """
+        )
+        await db.execute("DROP INDEX IF EXISTS idx_mem_user_topic")
+        await db.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_mem_user_topic
+            ON memories(user_id, topic)
+            """
+        )
+
+    async def _ensure_fts(self, db) -> bool:
+        # full-text index over topic/content, kept in sync by triggers;
+        # falls back to LIKE scans if this SQLite build lacks FTS5
+        existing = await db.execute_fetchall(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'"
+        )
+        try:
+            await db.executescript(
                 """
-                CREATE INDEX IF NOT EXISTS idx_mem_user_topic
-                ON memories(user_id, topic)
+                CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+                    topic, content,
+                    content='memories', content_rowid='id', tokenize='unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+                    INSERT INTO memories_fts(rowid, topic, content)
+                    VALUES (new.id, new.topic, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, topic, content)
+                    VALUES ('delete', old.id, old.topic, old.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, topic, content)
+                    VALUES ('delete', old.id, old.topic, old.content);
+                    INSERT INTO memories_fts(rowid, topic, content)
+                    VALUES (new.id, new.topic, new.content);
+                END;
                 """
             )
+            if not existing:
+                # index rows written before the FTS table existed
+                await db.execute("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')")
             await db.commit()
-        self._initialized = True
+        except aiosqlite.OperationalError:
+            return False
+        return True
 
     async def _prune(self, db, user_id: str):
-        count = await db.execute_fetchall(
-            "SELECT COUNT(*) FROM memories WHERE user_id = ?", (user_id,)
-        )
+        count = await db.execute_fetchall(_COUNT_SQL, (user_id,))
         if count[0][0] > self.valves.max_memories_per_user:
             await db.execute(
-                """
-                DELETE FROM memories WHERE id IN (
-                    SELECT id FROM memories WHERE user_id = ?
-                    ORDER BY updated_at ASC
-                    LIMIT ?
-                )
-                """,
-                (user_id, count[0][0] - self.valves.max_memories_per_user),
+                _PRUNE_SQL, (user_id, count[0][0] - self.valves.max_memories_per_user)
             )
 
     async def remember(
@@ -92,28 +179,26 @@ class Tools:
         user_id = __user__["id"] if __user__ else "anonymous"
         now = datetime.now().isoformat()
 
-        async with aiosqlite.connect(self.valves.db_path) as db:
-            existing = await db.execute(
-                "SELECT id FROM memories WHERE user_id = ? AND topic = ?",
-                (user_id, topic),
-            )
-            row = await existing.fetchone()
-
-            if row:
-                await db.execute(
-                    "UPDATE memories SET content = ?, updated_at = ? WHERE id = ?",
-                    (content, now, row[0]),
-                )
-                action = "Updated"
-            else:
-                await db.execute(
-                    "INSERT INTO memories (user_id, topic, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-                    (user_id, topic, content, now, now),
+        db = self._conn
+        async with self._write_lock:
+            try:
+                rows = await db.execute_fetchall(
+                    _UPSERT_SQL, (user_id, topic, content, now, now)
                 )
-                action = "Stored"
+                action = "Stored" if rows[0][0] else "Updated"
 
-            await self._prune(db, user_id)
-            await db.commit()
+                # the cap is soft: between prunes a user may exceed it by up to
+                # _PRUNE_EVERY - 1; pruning on the first write covers the counter
+                # resetting whenever the tool is reloaded or the process restarts
+                n = self._write_count.get(user_id, 0) + 1
+                self._write_count[user_id] = n
+                if n % _PRUNE_EVERY == 1:
+                    await self._prune(db, user_id)
+                await db.commit()
+            except BaseException:
+                # never leave a failed transaction open on the shared connection
+                await db.rollback()
+                raise
 
         if __event_emitter__:
             await __event_emitter__(
@@ -147,18 +232,30 @@ class Tools:
                 }
             )
 
-        async with aiosqlite.connect(self.valves.db_path) as db:
-            if query.strip() == "*":
-                cursor = await db.execute(
-                    "SELECT topic, content, updated_at FROM memories WHERE user_id = ? ORDER BY updated_at DESC",
-                    (user_id,),
+        # every word becomes a quoted prefix term, ANDed together
+        terms = re.findall(r"\w+", query)
+        fts_query = " ".join(f'"{t}"*' for t in terms)
+
+        db = self._conn
+        if query.strip() == "*":
+            rows = await db.execute_fetchall(
+                "SELECT topic, content, updated_at FROM memories WHERE user_id = ? ORDER BY updated_at DESC",
+                (user_id,),
+            )
+        else:
+            rows = []
+            if self._fts and fts_query:
+                rows = await db.execute_fetchall(
+                    "SELECT m.topic, m.content, m.updated_at FROM memories m JOIN memories_fts f ON f.rowid = m.id WHERE m.user_id = ? AND memories_fts MATCH ? ORDER BY m.updated_at DESC",
+                    (user_id, fts_query),
                 )
-            else:
-                cursor = await db.execute(
+            if not rows:
+                # FTS only matches word prefixes; fall back to a substring scan
+                # so fragments inside words ("ust" in "rust") still match
+                rows = await db.execute_fetchall(
                     "SELECT topic, content, updated_at FROM memories WHERE user_id = ? AND (topic LIKE ? OR content LIKE ?) ORDER BY updated_at DESC",
                     (user_id, f"%{query}%", f"%{query}%"),
                 )
-            rows = await cursor.fetchall()
 
         if not rows:
             if __event_emitter__:
@@ -198,13 +295,19 @@ class Tools:
         await self._ensure_db()
         user_id = __user__["id"] if __user__ else "anonymous"
 
-        async with aiosqlite.connect(self.valves.db_path) as db:
-            cursor = await db.execute(
-                "DELETE FROM memories WHERE user_id = ? AND topic = ?",
-                (user_id, topic),
-            )
-            await db.commit()
-            deleted = cursor.rowcount
+        db = self._conn
+        async with self._write_lock:
+            try:
+                cursor = await db.execute(
+                    "DELETE FROM memories WHERE user_id = ? AND topic = ?",
+                    (user_id, topic),
+                )
+                await db.commit()
+                deleted = cursor.rowcount
+            except BaseException:
+                # never leave a failed transaction open on the shared connection
+                await db.rollback()
+                raise
 
         if __event_emitter__:
             await __event_emitter__(
@@ -4,23 +4,35 @@ author: Cole
 author_url: https://github.com/Cole-Cant-Code
 description: Deep web page reader. Fetches, cleans, and extracts article content from URLs.
 required_open_webui_version: 0.4.0
-requirements: requests, beautifulsoup4
+requirements: aiohttp, beautifulsoup4, lxml
 version: 1.0.0
 licence: MIT
 """
 
-import requests
+import asyncio
+import re
+
+import aiohttp
 from bs4 import BeautifulSoup
 from pydantic import BaseModel, Field
 
 NOISE_TAGS = ["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript", "svg"]
 NOISE_CLASSES = ["sidebar", "menu", "cookie", "banner", "popup", "modal", "advertisement", "social-share", "related-posts", "comment"]
+NOISE_RE = re.compile("|".join(map(re.escape, NOISE_CLASSES)), re.IGNORECASE)
+# pages smaller than this parse faster inline than the thread hop costs
+INLINE_PARSE_MAX = 8192
 
 
 class Tools:
     class Valves(BaseModel):
         timeout: int = Field(default=15, ge=5, le=60, description="Request timeout in seconds")
         max_chars: int = Field(default=8000, ge=1000, le=50000, description="Max characters to extract")
+        max_page_bytes: int = Field(
+            default=2_000_000,
+            ge=100_000,
+            le=20_000_000,
+            description="Stop downloading a page after this many (decompressed) bytes",
+        )
         user_agent: str = Field(
             default="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             description="User-Agent header for requests",
@@ -29,6 +41,47 @@ class Tools:
     def __init__(self):
         self.valves = self.Valves()
         self.citation = False
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # one pooled session per tool instance: keep-alive, TLS reuse, DNS cache
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the pooled HTTP session; it is recreated on next use."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _extract(self, html: bytes, charset: str | None = None) -> tuple[str, str, str]:
+        """Parse HTML and return (title, meta description, cleaned text)."""
+        # bytes in, so bs4 can honour <meta charset> and sniff when no header charset is given
+        soup = BeautifulSoup(html, "lxml", from_encoding=charset)
+
+        title = (soup.title.string.strip() if soup.title and soup.title.string else "Untitled")
+        meta_desc = ""
+        meta_tag = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
+        if meta_tag:
+            meta_desc = meta_tag.get("content", "")
+
+        for tag in soup(NOISE_TAGS):
+            tag.decompose()
+        for tag in soup.find_all(class_=NOISE_RE) + soup.find_all(id=NOISE_RE):
+            # nested matches are already gone once an ancestor is decomposed
+            if not tag.decomposed:
+                tag.decompose()
+
+        main = soup.find("article") or soup.find("main") or soup.find(role="main") or soup.find("body")
+        if not main:
+            main = soup
+
+        text = main.get_text(separator="\n", strip=True)
+        lines = [line for line in text.split("\n") if line.strip()]
+        return title, meta_desc, "\n".join(lines)
 
     async def read_webpage(self, url: str, __event_emitter__=None) -> str:
         """
@@ -46,54 +99,43 @@ class Tools:
                     {"type": "status", "data": {"description": f"Fetching {short}", "done": False}}
                 )
 
-            r = requests.get(
+            async with self._get_session().get(
                 url,
-                timeout=self.valves.timeout,
+                timeout=aiohttp.ClientTimeout(total=self.valves.timeout),
                 headers={"User-Agent": self.valves.user_agent, "Accept": "text/html,application/xhtml+xml,*/*"},
                 allow_redirects=True,
-            )
-            r.raise_for_status()
+            ) as r:
+                r.raise_for_status()
+                final_url = str(r.url)
+                content_type = r.headers.get("content-type", "")
+                # stream and stop early so huge pages never sit fully in memory
+                chunks = []
+                total = 0
+                async for chunk in r.content.iter_chunked(8192):
+                    chunks.append(chunk)
+                    total += len(chunk)
+                    if total >= self.valves.max_page_bytes:
+                        break
+                raw = b"".join(chunks)
+                charset = r.charset
 
-            content_type = r.headers.get("content-type", "")
             if "html" not in content_type and "xhtml" not in content_type:
+                try:
+                    body = raw.decode(charset or "utf-8", errors="replace")
+                except LookupError:
+                    # unknown charset label in the Content-Type header
+                    body = raw.decode("utf-8", errors="replace")
                 if __event_emitter__:
                     await __event_emitter__(
                         {"type": "status", "data": {"description": f"Non-HTML: {content_type}", "done": True}}
                     )
-                return f"Non-HTML content ({content_type}). Raw preview:\n\n```\n{r.text[:self.valves.max_chars]}\n```"
-
-            soup = BeautifulSoup(r.text, "html.parser")
-
-            title = (soup.title.string.strip() if soup.title and soup.title.string else "Untitled")
-            meta_desc = ""
-            meta_tag = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
-            if meta_tag:
-                meta_desc = meta_tag.get("content", "")
-
-            for tag in soup(NOISE_TAGS):
-                tag.decompose()
-            for tag in soup.find_all(
-                attrs={
-                    "class": lambda c: c
-                    and any(noise in str(c).lower() for noise in NOISE_CLASSES)
-                }
-            ):
-                tag.decompose()
-            for tag in soup.find_all(
-                attrs={
-                    "id": lambda i: i
-                    and any(noise in str(i).lower() for noise in NOISE_CLASSES)
-                }
-            ):
-                tag.decompose()
-
-            main = soup.find("article") or soup.find("main") or soup.find(role="main") or soup.find("body")
-            if not main:
-                main = soup
+                return f"Non-HTML content ({content_type}). Raw preview:\n\n```\n{body[:self.valves.max_chars]}\n```"
 
-            text = main.get_text(separator="\n", strip=True)
-            lines = [line for line in text.split("\n") if line.strip()]
-            text = "\n".join(lines)
+            # parsing is CPU-bound; keep large pages off the event loop
+            if len(raw) < INLINE_PARSE_MAX:
+                title, meta_desc, text = self._extract(raw, charset)
+            else:
+                title, meta_desc, text = await asyncio.to_thread(self._extract, raw, charset)
 
             truncated = False
             if len(text) > self.valves.max_chars:
@@ -106,8 +148,8 @@ class Tools:
                         "type": "source",
                         "data": {
                             "document": [text[:2000]],
-                            "metadata": [{"source": title, "url": r.url}],
-                            "source": {"name": title, "url": r.url},
+                            "metadata": [{"source": title, "url": final_url}],
+                            "source": {"name": title, "url": final_url},
                         },
                     }
                 )
@@ -124,21 +166,21 @@ class Tools:
             result = f"# {title}\n"
             if meta_desc:
                 result += f"*{meta_desc}*\n"
-            result += f"Source: {r.url}\n\n---\n\n{text}"
+            result += f"Source: {final_url}\n\n---\n\n{text}"
             if truncated:
                 result += f"\n\n---\n*Truncated at {self.valves.max_chars:,} chars. Full page was larger.*"
 
             return result
 
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             if __event_emitter__:
                 await __event_emitter__(
                     {"type": "status", "data": {"description": "Timed out", "done": True}}
                 )
             return f"Timeout after {self.valves.timeout}s fetching {url}."
 
-        except requests.exceptions.HTTPError as e:
-            code = e.response.status_code if e.response else "unknown"
+        except aiohttp.ClientResponseError as e:
+            code = e.status or "unknown"
             if __event_emitter__:
                 await __event_emitter__(
                     {"type": "status", "data": {"description": f"HTTP {code}", "done": True}}